@@ -1,15 +1,141 @@
 # interrupt_handler.py
 # Place in your repo, e.g. livekit_agents/utils/interrupt_handler.py
 
+import functools
+import heapq
+import itertools
+import queue
+import re
 import threading
 import time
-from typing import Callable, List, Optional, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, NamedTuple, Optional, Dict
+
+from ..log import logger
+
+try:
+    # optional: google-re2 compiles the hard-phrase matcher to a linear-time automaton
+    import re2 as _phrase_re  # type: ignore
+except ImportError:
+    _phrase_re = re
+
+# punctuation other than apostrophes/hyphens is stripped before matching
+_NORM_RE = re.compile(r"[^\w\s'-]")
+_WS_RE = re.compile(r"\s+")
+# same mapping for ASCII input, applied by str.translate without going through the regex engine
+_ASCII_NORM_TABLE = str.maketrans(
+    {chr(c): " " for c in range(128) if _NORM_RE.match(chr(c))}
+)
+
+@functools.lru_cache(maxsize=512)
+def _norm_cached(s: str) -> str:
+    # simple normalization: remove punctuation (except apostrophes), normalize whitespace.
+    # Streaming STT repeats the same partial text while it stabilizes, hence the cache.
+    if s.isascii():
+        return " ".join(s.translate(_ASCII_NORM_TABLE).split())
+    return _WS_RE.sub(' ', _NORM_RE.sub(' ', s)).strip()
+
+class _TimerHandle:
+    __slots__ = ("callback", "cancelled")
+
+    def __init__(self, callback: Callable[[], None]) -> None:
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+class _TimerScheduler:
+    """
+    Runs delayed callbacks from a single long-lived daemon thread, so arming a validation
+    window doesn't cost a new thread per VAD event. Cancelled entries are dropped lazily.
+
+    The thread is shared by every InterruptHandler in the process: callbacks must return
+    quickly and must not call user code, otherwise they delay every other pending timer.
+    InterruptHandler hands its expiry work to a per-handler worker for that reason.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._heap: list[tuple[float, int, _TimerHandle]] = []
+        self._seq = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> _TimerHandle:
+        handle = _TimerHandle(callback)
+        with self._cond:
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), handle))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="interrupt_handler_timer", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+        return handle
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    deadline, _, handle = self._heap[0]
+                    if handle.cancelled:
+                        heapq.heappop(self._heap)
+                        continue
+                    delay = deadline - time.monotonic()
+                    if delay <= 0:
+                        heapq.heappop(self._heap)
+                        break
+                    self._cond.wait(delay)
+
+            if handle.cancelled:
+                continue
+            try:
+                handle.callback()
+            except Exception:
+                logger.exception("error in interrupt handler timer callback")
+
+_scheduler = _TimerScheduler()
+
+# outcomes of classifying an STT transcript, decided while draining events and acted on after
+_PROCESS = "process"  # no VAD pending (re-checked while draining) -> forward the transcript as-is
+_HARD = "hard"  # hard word -> stop the agent
+_SOFT = "soft"  # only backchannel while speaking -> ignore
+_INTERRUPT = "interrupt"  # other content while speaking -> stop the agent
+_NORMAL = "normal"  # agent silent -> forward the transcript text
+
+class _SttDecision(NamedTuple):
+    action: str
+    text: str = ""
+    norm: str = ""
+    hard_word: str = ""
+    is_final: bool = False
+
+_TRIE_END = ""  # terminal marker, never collides with a single-character key
+
+def _trie_to_pattern(node: dict[str, dict]) -> str:
+    # the pattern sticks to syntax shared by re and re2 (no lookaround, no escaped spaces)
+    alts = [
+        (ch if ch == " " else re.escape(ch)) + _trie_to_pattern(child)
+        for ch, child in sorted(node.items())
+        if ch
+    ]
+    if not alts:
+        return ""
+    pattern = alts[0] if len(alts) == 1 else f"(?:{'|'.join(alts)})"
+    # a phrase ends here but longer ones continue: the greedy ? prefers the longest phrase
+    return f"(?:{pattern})?" if _TRIE_END in node else pattern
 
 class Transcript:
+    __slots__ = ("text", "is_final", "timestamp")
+
     def __init__(self, text: str, is_final: bool = False, timestamp: Optional[float] = None):
         self.text = text
         self.is_final = is_final
-        self.timestamp = timestamp or time.time()
+        # monotonic clock, comparable with the validation timer deadlines
+        self.timestamp = timestamp if timestamp is not None else time.monotonic()
 
 class InterruptHandlerConfig:
     def __init__(
@@ -18,14 +144,30 @@ class InterruptHandlerConfig:
         hard_words: Optional[List[str]] = None,
         validation_window_ms: int = 225
     ):
-        self.soft_words = [s.lower() for s in (soft_words or [
+        self.soft_words = frozenset(s.lower() for s in (soft_words or [
             'yeah','ok','hmm','right','uh-huh','mhm','uh huh'
-        ])]
+        ]))
         self.hard_words = [h.lower() for h in (hard_words or [
             'wait','stop','no','hold on','pause','cancel','hang on','stop that','stop it'
         ])]
         self.validation_window_ms = validation_window_ms
 
+        # hard phrases share prefixes ("stop", "stop it", "stop that"), so they are stored in a
+        # character trie and compiled into one regex with the common prefixes factored out.
+        # Matches must start at a word boundary; group 1 is the matched phrase.
+        self._hard_trie: dict[str, dict] = {}
+        for phrase in self.hard_words:
+            node = self._hard_trie
+            for ch in phrase:
+                node = node.setdefault(ch, {})
+            if phrase:
+                node[_TRIE_END] = {}
+        self._hard_re = (
+            _phrase_re.compile(f"(?:^| )({_trie_to_pattern(self._hard_trie)})")
+            if self._hard_trie
+            else None
+        )
+
 class InterruptHandler:
     """
     Handles VAD -> STT race by validating transcripts for short soft-words.
@@ -33,8 +175,27 @@ class InterruptHandler:
       - call on_vad_user_started() when VAD says user started speaking
       - call on_stt_transcript(Transcript(...)) when STT partials/finals arrive
       - supply callbacks for stopping agent playback, processing normally, etc.
+    Exceptions raised by the callbacks are logged, never propagated to the caller.
     """
 
+    __slots__ = (
+        "cfg",
+        "stop_agent_immediately",
+        "ignore_user_speech",
+        "process_user_speech_normally",
+        "get_agent_speaking_state",
+        "logger",
+        "_log_enabled",
+        "_soft",
+        "_hard_re",
+        "_pending_vad",
+        "_timer",
+        "_timer_gen",
+        "_expiry_executor",
+        "_events",
+        "_drain_lock",
+    )
+
     def __init__(
         self,
         config: InterruptHandlerConfig,
@@ -50,119 +211,235 @@ class InterruptHandler:
         self.process_user_speech_normally = process_user_speech_normally
         self.get_agent_speaking_state = get_agent_speaking_state
         self.logger = logger or (lambda x: None)
+        # log messages are only formatted when a logger was supplied
+        self._log_enabled = logger is not None
+        # config values used per transcript, bound once to skip the self.cfg indirection
+        self._soft = config.soft_words
+        self._hard_re = config._hard_re
 
-        self._pending_vad = False
-        self._transcript_buffer: List[Transcript] = []
-        self._timer: Optional[threading.Timer] = None
-        self._lock = threading.Lock()
+        # read unsynchronized on the STT fast path, only written while draining _events
+        self._pending_vad: bool = False
+        self._timer: Optional[_TimerHandle] = None
+        # bumped whenever a validation timer is armed; only written while draining _events
+        self._timer_gen = 0
+        # runs expiries (which call user code) off the shared scheduler thread, started lazily
+        self._expiry_executor: Optional[ThreadPoolExecutor] = None
+        # pending state transitions, applied in order by whichever caller holds _drain_lock
+        self._events: queue.SimpleQueue[Callable[[], Optional[Callable[[], None]]]] = (
+            queue.SimpleQueue()
+        )
+        self._drain_lock = threading.Lock()
 
     def on_vad_user_started(self) -> None:
-        with self._lock:
-            self.logger(f"[{self._now()}] VAD user-start detected.")
-            # If agent not speaking => we let normal processing happen (but we still await STT)
-            self._pending_vad = True
-            self._transcript_buffer = []
-            self._start_timer()
+        self._submit(self._handle_vad_started)
 
     def on_stt_transcript(self, transcript: Transcript) -> None:
-        with self._lock:
-            if not self._pending_vad:
-                # No VAD pending — process normally (agent silent or no race)
-                self.logger(f"[{self._now()}] STT arrived with no VAD pending: '{transcript.text}'")
-                self.process_user_speech_normally(transcript)
-                return
-
-            # Accumulate transcript fragments
-            self._transcript_buffer.append(transcript)
-            combined = " ".join(t.text for t in self._transcript_buffer).lower().strip()
-            norm = self._normalize(combined)
-            self.logger(f"[{self._now()}] STT during pending VAD: '{combined}' -> norm='{norm}'")
-
-            # Check for any hard words (phrase match)
-            for hard in self.cfg.hard_words:
-                if hard in norm:
-                    self._clear_pending()
-                    self.logger(f"[{self._now()}] Hard word '{hard}' detected -> interrupting immediately.")
-                    self.stop_agent_immediately()
-                    return
-
-            # If agent is speaking, check if the transcript is only soft words
-            if self.get_agent_speaking_state():
-                tokens = norm.split()
-                # consider it soft if it's short and all tokens are in soft list or tiny fillers
-                only_soft = all((t in self.cfg.soft_words) or (len(t) <= 2) for t in tokens)
-                if only_soft:
-                    self._clear_pending()
-                    self.logger(f"[{self._now()}] Only soft/backchannel detected -> IGNORING while speaking.")
-                    if self.ignore_user_speech:
-                        self.ignore_user_speech()
-                    return
-                else:
-                    # contains other words -> treat as interrupt
-                    self._clear_pending()
-                    self.logger(f"[{self._now()}] Non-soft content while speaking -> INTERRUPT.")
-                    self.stop_agent_immediately()
-                    return
-            else:
-                # Agent not speaking and VAD pending -> process transcript normally
-                self._clear_pending()
-                self.logger(f"[{self._now()}] Agent silent -> processing user speech normally.")
-                self.process_user_speech_normally(Transcript(combined, transcript.is_final))
-                return
+        # Unsynchronized fast path: with no VAD pending (and none queued) there is no state to
+        # touch. The flag is re-checked by _classify in case VAD fires concurrently.
+        if not self._pending_vad and self._events.empty():
+            self._run_effect(functools.partial(self._forward_stt, transcript))
+            return
+
+        # sampled once per transcript, outside the drain, so a user callback never runs while
+        # owning the state and the state can't flip between branches of the classification
+        speaking = self.get_agent_speaking_state()
+        self._submit(functools.partial(self._handle_stt, transcript, speaking))
 
     def agent_started_speaking(self) -> None:
-        with self._lock:
-            # reset any pending VAD (we are starting to talk)
-            self._clear_pending()
-            self.logger(f"[{self._now()}] Agent started speaking - state reset.")
+        self._submit(self._handle_agent_started)
 
     def agent_stopped_speaking(self) -> None:
-        with self._lock:
+        self._submit(self._handle_agent_stopped)
+
+    def _submit(self, handler: Callable[[], Optional[Callable[[], None]]]) -> None:
+        # Single-writer model: producers (VAD, STT, timer, agent state) only enqueue state
+        # transitions and never block. Whichever caller wins the non-blocking acquire drains the
+        # queue and owns the pending state meanwhile. Handlers return an optional effect
+        # (callbacks/logging) which runs once ownership is released; the queue is re-checked
+        # afterwards so an event enqueued while another caller was draining is never stranded.
+        self._events.put(handler)
+        while not self._events.empty() and self._drain_lock.acquire(blocking=False):
+            effects: list[Callable[[], None]] = []
+            try:
+                while True:
+                    try:
+                        handler = self._events.get_nowait()
+                    except queue.Empty:
+                        break
+                    effect = handler()
+                    if effect is not None:
+                        effects.append(effect)
+            finally:
+                self._drain_lock.release()
+
+            # the batch can hold effects of other producers' events: one failing callback must
+            # neither drop the rest nor surface in whichever caller happened to drain
+            for effect in effects:
+                self._run_effect(effect)
+
+    @staticmethod
+    def _run_effect(effect: Callable[[], None]) -> None:
+        try:
+            effect()
+        except Exception:
+            logger.exception("error in interrupt handler callback")
+
+    def _handle_vad_started(self) -> Optional[Callable[[], None]]:
+        # If agent not speaking => we let normal processing happen (but we still await STT)
+        self._pending_vad = True
+        ms = self._start_timer()
+        if not self._log_enabled:
+            return None
+
+        def log() -> None:
+            self.logger(f"[{self._now()}] VAD user-start detected.")
+            self.logger(f"[{self._now()}] Validation timer started ({ms} ms).")
+
+        return log
+
+    def _handle_stt(self, transcript: Transcript, speaking: bool) -> Optional[Callable[[], None]]:
+        decision = self._classify(transcript.text, transcript.is_final, speaking)
+        if decision.action == _PROCESS:
+            return functools.partial(self._forward_stt, transcript)
+        # the Transcript isn't needed past classification, only its text and is_final
+        return functools.partial(self._dispatch_stt, decision)
+
+    def _handle_agent_started(self) -> Optional[Callable[[], None]]:
+        # reset any pending VAD (we are starting to talk)
+        self._clear_pending()
+        if not self._log_enabled:
+            return None
+        return lambda: self.logger(f"[{self._now()}] Agent started speaking - state reset.")
+
+    def _handle_agent_stopped(self) -> Optional[Callable[[], None]]:
+        self._clear_pending()
+        if not self._log_enabled:
+            return None
+        return lambda: self.logger(f"[{self._now()}] Agent stopped speaking - state reset.")
+
+    def _forward_stt(self, transcript: Transcript) -> None:
+        # No VAD pending — process normally (agent silent or no race)
+        if self._log_enabled:
+            self.logger(f"[{self._now()}] STT arrived with no VAD pending: '{transcript.text}'")
+        self.process_user_speech_normally(transcript)
+
+    def _dispatch_stt(self, decision: _SttDecision) -> None:
+        if self._log_enabled:
+            combined = decision.text.lower().strip()
+            self.logger(f"[{self._now()}] STT during pending VAD: '{combined}' -> norm='{decision.norm}'")
+        if decision.action == _HARD:
+            if self._log_enabled:
+                self.logger(f"[{self._now()}] Hard word '{decision.hard_word}' detected -> interrupting immediately.")
+            self.stop_agent_immediately()
+        elif decision.action == _SOFT:
+            if self._log_enabled:
+                self.logger(f"[{self._now()}] Only soft/backchannel detected -> IGNORING while speaking.")
+            if self.ignore_user_speech:
+                self.ignore_user_speech()
+        elif decision.action == _INTERRUPT:
+            if self._log_enabled:
+                self.logger(f"[{self._now()}] Non-soft content while speaking -> INTERRUPT.")
+            self.stop_agent_immediately()
+        else:
+            if self._log_enabled:
+                self.logger(f"[{self._now()}] Agent silent -> processing user speech normally.")
+            combined = decision.text.lower().strip()
+            self.process_user_speech_normally(Transcript(combined, decision.is_final))
+
+    def _classify(self, text: str, is_final: bool, speaking: bool) -> _SttDecision:
+        # must be called while draining _events
+        if not self._pending_vad:
+            return _SttDecision(_PROCESS)
+
+        # Every outcome below settles the pending VAD, so a transcript is always classified on
+        # its own: fragments are never accumulated across calls.
+        norm = _norm_cached(text.lower())
+
+        # Check for any hard words (phrase match)
+        hit = self._hard_re.search(norm) if self._hard_re else None
+        if hit:
             self._clear_pending()
-            self.logger(f"[{self._now()}] Agent stopped speaking - state reset.")
+            return _SttDecision(_HARD, text, norm, hit.group(1), is_final=is_final)
 
-    def _start_timer(self):
+        # If agent is speaking, check if the transcript is only soft words
+        if speaking:
+            # consider it soft if all tokens are in soft list or tiny fillers (len <= 2);
+            # stops at the first non-soft token
+            soft = self._soft
+            only_soft = not any(len(tok) > 2 and tok not in soft for tok in norm.split())
+            self._clear_pending()
+            # contains other words -> treat as interrupt
+            return _SttDecision(_SOFT if only_soft else _INTERRUPT, text, norm, is_final=is_final)
+
+        # Agent not speaking and VAD pending -> process transcript normally
+        self._clear_pending()
+        return _SttDecision(_NORMAL, text, norm, is_final=is_final)
+
+    def _start_timer(self) -> int:
         # Cancel existing timer
         if self._timer:
             self._timer.cancel()
             self._timer = None
-        # Launch a timer to avoid indefinite waiting for STT
+        # Launch a timer to avoid indefinite waiting for STT. Each timer carries the generation
+        # it was armed for, so one superseded by a newer VAD start recognizes itself as stale.
+        self._timer_gen += 1
         ms = max(50, int(self.cfg.validation_window_ms))
-        self._timer = threading.Timer(ms / 1000.0, self._on_timer_expired)
-        self._timer.daemon = True
-        self._timer.start()
-        self.logger(f"[{self._now()}] Validation timer started ({ms} ms).")
-
-    def _on_timer_expired(self):
-        with self._lock:
-            if not self._pending_vad:
-                return
+        self._timer = _scheduler.call_later(
+            ms / 1000.0, functools.partial(self._on_timer_expired, self._timer_gen)
+        )
+        return ms
+
+    def _on_timer_expired(self, gen: int) -> None:
+        # runs on the shared scheduler thread. Stale timers return here without touching the
+        # speaking state or the event queue; live ones hand off to this handler's single
+        # long-lived worker, since the expiry calls user code that must not hold up other
+        # handlers' timers.
+        if gen != self._timer_gen or not self._pending_vad:
+            return
+        if self._expiry_executor is None:
+            self._expiry_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="interrupt_handler_expiry"
+            )
+        self._expiry_executor.submit(self._expire, gen)
+
+    def _expire(self, gen: int) -> None:
+        # may have been superseded while queued behind a slow expiry
+        if gen != self._timer_gen:
+            return
+        try:
+            speaking = self.get_agent_speaking_state()
+            self._submit(functools.partial(self._handle_timer_expired, gen, speaking))
+        except Exception:
+            logger.exception("error in interrupt handler timer expiry")
+
+    def _handle_timer_expired(self, gen: int, speaking: bool) -> Optional[Callable[[], None]]:
+        if gen != self._timer_gen or not self._pending_vad:
+            return None
+        self._clear_pending()
+        return functools.partial(self._dispatch_timeout, speaking)
+
+    def _dispatch_timeout(self, speaking: bool) -> None:
+        if self._log_enabled:
             self.logger(f"[{self._now()}] Validation timer expired.")
-            # Conservative default: if agent is speaking -> ignore
-            if self.get_agent_speaking_state():
+        # Conservative default: if agent is speaking -> ignore
+        if speaking:
+            if self._log_enabled:
                 self.logger(f"[{self._now()}] Timeout and agent was speaking -> IGNORE user speech.")
-                if self.ignore_user_speech:
-                    self.ignore_user_speech()
-                self._clear_pending()
-                return
-            else:
-                # No STT arrived and agent silent -> nothing to process
+            if self.ignore_user_speech:
+                self.ignore_user_speech()
+        else:
+            # No STT arrived and agent silent -> nothing to process
+            if self._log_enabled:
                 self.logger(f"[{self._now()}] Timeout and agent silent -> no STT -> nothing to do.")
-                self._clear_pending()
-                return
 
-    def _clear_pending(self):
+    def _clear_pending(self) -> None:
         self._pending_vad = False
-        self._transcript_buffer = []
         if self._timer:
             self._timer.cancel()
             self._timer = None
 
     def _normalize(self, s: str) -> str:
-        # simple normalization: remove punctuation (except apostrophes), normalize whitespace
-        import re
-        s2 = re.sub(r"[^\w\s'-]", ' ', s)
-        return " ".join(s2.split())
+        return _norm_cached(s)
 
     def _now(self) -> str:
         return time.strftime("%H:%M:%S", time.localtime())
@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from typing import Callable
+
+from livekit.agents.utils.interrupt_handler import (
+    InterruptHandler,
+    InterruptHandlerConfig,
+    Transcript,
+)
+
+
+class _Recorder:
+    def __init__(self, speaking: bool) -> None:
+        self.speaking = speaking
+        self.events: list[tuple[str, str | None]] = []
+
+    def stop(self) -> None:
+        self.events.append(("stop", None))
+
+    def ignore(self) -> None:
+        self.events.append(("ignore", None))
+
+    def process(self, t: Transcript) -> None:
+        self.events.append(("process", t.text))
+
+
+def _make_handler(speaking: bool, **cfg_kwargs) -> tuple[InterruptHandler, _Recorder]:
+    # large window so the validation timer never fires during a test
+    cfg = InterruptHandlerConfig(validation_window_ms=10_000, **cfg_kwargs)
+    rec = _Recorder(speaking)
+    handler = InterruptHandler(
+        cfg,
+        stop_agent_immediately=rec.stop,
+        ignore_user_speech=rec.ignore,
+        process_user_speech_normally=rec.process,
+        get_agent_speaking_state=lambda: rec.speaking,
+    )
+    return handler, rec
+
+
+def _wait_for(predicate: Callable[[], bool], timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_no_pending_vad_processes_normally() -> None:
+    handler, rec = _make_handler(speaking=True)
+    handler.on_stt_transcript(Transcript("hello there"))
+    assert rec.events == [("process", "hello there")]
+
+
+def test_soft_words_ignored_while_speaking() -> None:
+    handler, rec = _make_handler(speaking=True)
+    handler.on_vad_user_started()
+    handler.on_stt_transcript(Transcript("Yeah, ok."))
+    assert rec.events == [("ignore", None)]
+    handler.agent_stopped_speaking()
+
+
+def test_hard_word_interrupts() -> None:
+    handler, rec = _make_handler(speaking=True)
+    handler.on_vad_user_started()
+    handler.on_stt_transcript(Transcript("yeah okay but wait!"))
+    assert rec.events == [("stop", None)]
+
+
+def test_custom_hard_phrase() -> None:
+    handler, rec = _make_handler(speaking=False, hard_words=["Hold It"])
+    handler.on_vad_user_started()
+    handler.on_stt_transcript(Transcript("please hold it"))
+    assert rec.events == [("stop", None)]
+
+
+def test_non_soft_content_interrupts_while_speaking() -> None:
+    handler, rec = _make_handler(speaking=True)
+    handler.on_vad_user_started()
+    handler.on_stt_transcript(Transcript("tell me more"))
+    assert rec.events == [("stop", None)]
+
+
+def test_pending_vad_processes_when_agent_silent() -> None:
+    handler, rec = _make_handler(speaking=False)
+    handler.on_vad_user_started()
+    handler.on_stt_transcript(Transcript("Yeah"))
+    assert rec.events == [("process", "yeah")]
+
+
+def test_validation_timer_expires_while_speaking() -> None:
+    handler, rec = _make_handler(speaking=True)
+    handler.cfg.validation_window_ms = 50
+    handler.on_vad_user_started()
+    assert _wait_for(lambda: bool(rec.events))
+    assert rec.events == [("ignore", None)]
+
+
+def test_validation_timer_cancelled_by_transcript() -> None:
+    handler, rec = _make_handler(speaking=True)
+    handler.cfg.validation_window_ms = 50
+    handler.on_vad_user_started()
+    timer = handler._timer
+    handler.on_stt_transcript(Transcript("stop"))
+    assert rec.events == [("stop", None)]
+    # the scheduler skips cancelled handles, and a late fire finds no VAD pending
+    assert timer is not None and timer.cancelled
+    handler._on_timer_expired(handler._timer_gen)
+    assert rec.events == [("stop", None)]
+
+
+def test_callbacks_can_reenter_handler() -> None:
+    handler, rec = _make_handler(speaking=True)
+
+    def stop() -> None:
+        rec.speaking = False
+        handler.agent_stopped_speaking()
+        rec.stop()
+
+    handler.stop_agent_immediately = stop
+    handler.on_vad_user_started()
+    handler.on_stt_transcript(Transcript("wait"))
+    assert rec.events == [("stop", None)]
+
+
+def test_logger_receives_messages_when_supplied() -> None:
+    messages: list[str] = []
+    handler = InterruptHandler(
+        InterruptHandlerConfig(validation_window_ms=10_000),
+        stop_agent_immediately=lambda: None,
+        ignore_user_speech=None,
+        process_user_speech_normally=lambda t: None,
+        get_agent_speaking_state=lambda: True,
+        logger=messages.append,
+    )
+    handler.on_vad_user_started()
+    handler.on_stt_transcript(Transcript("hang on"))
+    assert any("Hard word 'hang on'" in m for m in messages)
+
+
+def test_hard_words_match_at_word_start_only() -> None:
+    handler, rec = _make_handler(speaking=False)
+    handler.on_vad_user_started()
+    handler.on_stt_transcript(Transcript("I know"))
+    assert rec.events == [("process", "i know")]
+
+
+def test_longest_hard_phrase_is_reported() -> None:
+    cfg = InterruptHandlerConfig()
+    hit = cfg._hard_re.search("please stop that now")
+    assert hit is not None and hit.group(1) == "stop that"
+    hit = cfg._hard_re.search("stopping")
+    assert hit is not None and hit.group(1) == "stop"
+
+
+def test_speaking_state_sampled_once_per_transcript() -> None:
+    handler, rec = _make_handler(speaking=True)
+    calls = 0
+
+    def speaking_state() -> bool:
+        nonlocal calls
+        calls += 1
+        return True
+
+    handler.get_agent_speaking_state = speaking_state
+    handler.on_vad_user_started()
+    handler.on_stt_transcript(Transcript("tell me more"))
+    assert rec.events == [("stop", None)]
+    assert calls == 1
+
+
+def test_event_submitted_while_draining_is_applied() -> None:
+    handler, rec = _make_handler(speaking=True)
+    # another caller owns the drain: the VAD start is only queued
+    handler._drain_lock.acquire()
+    handler.on_vad_user_started()
+    assert not handler._pending_vad
+    handler._drain_lock.release()
+
+    # the next caller drains the queued VAD start before its own transcript
+    handler.on_stt_transcript(Transcript("tell me more"))
+    assert rec.events == [("stop", None)]
+    assert handler._events.empty()
+
+
+def test_event_queued_during_drain_is_applied() -> None:
+    handler, rec = _make_handler(speaking=True)
+
+    def enqueue_vad_start() -> None:
+        # runs while draining, like a producer whose non-blocking acquire failed
+        handler._events.put(handler._handle_vad_started)
+
+    handler._events.put(enqueue_vad_start)
+    handler.agent_stopped_speaking()
+    assert handler._pending_vad
+    assert handler._events.empty()
+    handler.agent_stopped_speaking()
+
+
+def test_normalize_ascii_and_unicode() -> None:
+    handler, _ = _make_handler(speaking=False)
+    assert handler._normalize("  uh-huh, don't\tstop!! ") == "uh-huh don't stop"
+    assert handler._normalize("¡café, déjà vu!") == "café déjà vu"
+
+
+def test_superseded_timer_is_ignored() -> None:
+    handler, rec = _make_handler(speaking=True)
+    handler.on_vad_user_started()
+    stale_gen = handler._timer_gen
+    handler.on_vad_user_started()
+    handler._on_timer_expired(stale_gen)
+    assert rec.events == []
+    assert handler._pending_vad
+    handler.agent_stopped_speaking()
+
+
+def test_slow_expiry_does_not_delay_other_handlers() -> None:
+    slow, slow_rec = _make_handler(speaking=True)
+    fast, fast_rec = _make_handler(speaking=True)
+    slow.cfg.validation_window_ms = 50
+    fast.cfg.validation_window_ms = 100
+
+    release = threading.Event()
+
+    def slow_speaking_state() -> bool:
+        release.wait(5.0)
+        return True
+
+    slow.get_agent_speaking_state = slow_speaking_state
+    slow.on_vad_user_started()
+    fast.on_vad_user_started()
+    assert _wait_for(lambda: bool(fast_rec.events))
+    assert fast_rec.events == [("ignore", None)]
+    assert slow_rec.events == []
+
+    # let the slow expiry finish so it doesn't outlive the test
+    release.set()
+    assert _wait_for(lambda: bool(slow_rec.events))
+    assert slow_rec.events == [("ignore", None)]
+
+
+def test_failing_callback_does_not_drop_other_effects() -> None:
+    handler, rec = _make_handler(speaking=True)
+
+    def stop() -> None:
+        rec.stop()
+        raise RuntimeError("playback already closed")
+
+    handler.stop_agent_immediately = stop
+    handler.on_vad_user_started()
+    # another producer's hard-word event, queued ahead of this caller's transcript
+    handler._events.put(functools.partial(handler._handle_stt, Transcript("wait"), True))
+    handler.on_stt_transcript(Transcript("hello there"))
+    assert rec.events == [("stop", None), ("process", "hello there")]
+
+
+def test_expiries_reuse_one_worker_per_handler() -> None:
+    handler, rec = _make_handler(speaking=True)
+    handler.cfg.validation_window_ms = 50
+    for expected in (1, 2):
+        handler.on_vad_user_started()
+        assert _wait_for(lambda n=expected: len(rec.events) == n)
+
+    # both expiries ran on the same long-lived worker
+    assert handler._expiry_executor is not None
+    assert len(handler._expiry_executor._threads) == 1
+
+
+def test_failing_callback_on_fast_path_is_logged() -> None:
+    handler, rec = _make_handler(speaking=True)
+
+    def process(t: Transcript) -> None:
+        rec.process(t)
+        raise RuntimeError("pipeline closed")
+
+    # no VAD pending: forwarded without the queue, but failures are handled the same way
+    handler.process_user_speech_normally = process
+    handler.on_stt_transcript(Transcript("hello there"))
+    assert rec.events == [("process", "hello there")]